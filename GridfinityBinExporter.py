@@ -1,3 +1,5 @@
+import csv
+import gc
 import itertools
 import math
 import platform
@@ -5,6 +7,8 @@ import shutil
 import subprocess
 import sys
 import os
+import time
+import tracemalloc
 
 # include __pypackages__ / bin
 sys.path.append(os.path.join(os.path.dirname(__file__), '__pypackages__'))
@@ -12,11 +16,14 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'bin'))
 os.environ['PATH'] += f"{os.pathsep}{os.path.normpath(os.path.join(os.path.dirname(__file__), 'bin'))}"
 
 import adsk.core, adsk.fusion, traceback
-from typing import List, Literal
+from typing import Dict, List, Literal, Tuple
 from timeit import default_timer as timer
 from datetime import timedelta, datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import imageio
+import psutil
 import pygifsicle
+from PIL import Image
 import zipfile, glob, re
 
 class IDS:
@@ -70,6 +77,7 @@ class INPUTS:
     gif_lossy: adsk.core.IntegerSpinnerCommandInput
     gif_optimize: adsk.core.IntegerSpinnerCommandInput
     gif_colors: adsk.core.IntegerSpinnerCommandInput
+    gif_max_kb: adsk.core.IntegerSpinnerCommandInput
 
     def clear_wall_thickness(self):
         self.wall_thickness = []
@@ -92,8 +100,39 @@ INIT_Z_END=18
 INIT_Z_STEPS=3
 INIT_DEFAULT_EXPORT_PATH = 'C:/Export-F360'
 
-INIT_SCREENSHOT_W=640 # 1920 
-INIT_SCREENSHOT_H=360 # 1080
+INIT_SCREENSHOT_W=1920 # captured once, see THUMBNAIL_TARGETS for the output sizes
+INIT_SCREENSHOT_H=1080
+
+# --- Thumbnails
+
+# name: (width, height, format, quality) - resized from the screenshot, changing these never requires a new capture
+# quality 0 means the format default (e.g. for png)
+# thumbnails are never upscaled, targets bigger than the screenshot (e.g. jpg screenshots of older exports) are skipped
+THUMBNAIL_TARGETS = {
+    'gif': (640, 360, 'png', 0),
+    'listing': (1920, 1080, 'jpg', 92),
+    'catalog': (320, 180, 'webp', 80),
+}
+THUMBNAIL_GIF_TARGET = 'gif' # frames used for the GIF creation
+THUMBNAIL_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# --- GIF size budget
+
+GIF_BUDGET_LEVELS = 8 # quality steps between lossless and the configured Lossy / Colors, binary searched per part
+GIF_BUDGET_SAMPLE_FRAMES = 12 # frames encoded to estimate the size per frame
+GIF_BUDGET_HEADROOM = 0.9 # aim a bit below the budget when picking the amount of frames
+
+# --- Resource monitor (writes monitor-*.csv into the export folder)
+
+MONITOR_SAMPLE_EVERY = 25 # exported variants per sample, 0 to disable
+MONITOR_WINDOW = 8 # most of these samples must be above a limit to count as sustained
+MONITOR_MAX_RSS_GROWTH_MB = 1024 # growth of Fusion's memory since the start of the run
+MONITOR_MAX_SLOWDOWN = 1.5 # step time compared to the step time vs footprint trend of the first X row(s)
+MONITOR_MITIGATION: Literal['none', 'pause', 'stop'] = 'none' # 'pause' escalates to 'stop' after MONITOR_MAX_PAUSES back-to-back detections
+MONITOR_MAX_PAUSES = 3
+MONITOR_PAUSE_SECONDS = 10
+MONITOR_TRACEMALLOC = False # python heap + top allocators, slows down every python allocation and adds to the memory
+MONITOR_TOP_ALLOCATORS = 3
 
 # --- Templates
 
@@ -102,6 +141,146 @@ TPL_VARIANT_NAME = "gfbin1.2_{x}x{y}x{z}_w{wall_width}d{divisions}"
 
 # ---
 
+class ResourceCheckpoint(Exception):
+    """
+    Raised to end the export loop cleanly, the run can be resumed with 'Skip Existing STL'
+    """
+
+class ResourceMonitor:
+    """
+    Samples Fusion's memory, the python heap and the step time per variant into a csv
+    and detects sustained memory growth or slowdown against baselines of the whole run
+
+    Bins get bigger along the export loop, so step times are compared to a step time vs footprint
+    trend (per kind of work) which is fitted on the first X row(s)
+    """
+    def __init__(self, csv_file: str):
+        self.__csv_file = csv_file
+        self.__process = psutil.Process()
+        self.__start_rss_mb = 0.0
+        self.__samples: List[Tuple[float, float | None]] = [] # (rss growth in MB, avg relative step time)
+        self.__step_times: List[float] = []
+        self.__relative_times: List[float] = []
+        self.__baseline_steps: Dict[str, List[Tuple[int, int, float]]] = {} # work -> [(x, footprint, step time)]
+        self.__trends: Dict[str, Tuple[float, float]] = {} # work -> (a, b) of step time = a + b * footprint
+        self.__steps = 0
+        self.__pauses = 0
+        self.__own_tracemalloc = False
+        self.reason = ''
+
+    def start(self):
+        if MONITOR_TRACEMALLOC and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__own_tracemalloc = True
+        self.__start_rss_mb = self.__process.memory_info().rss / 1024**2
+
+        with open(self.__csv_file, 'w', newline='') as f:
+            csv.writer(f).writerow(['time', 'variants', 'rss_mb', 'rss_growth_mb', 'python_heap_mb', 'step_avg_s', 'step_vs_trend', 'action', 'top_allocators'])
+
+    def stop(self):
+        if self.__own_tracemalloc:
+            tracemalloc.stop()
+            self.__own_tracemalloc = False
+
+    def record_step(self, work: str, x: int, footprint: int, duration: float) -> Literal['none', 'pause', 'stop']:
+        self.__steps += 1
+        self.__step_times.append(duration)
+
+        if work in self.__trends:
+            a, b = self.__trends[work]
+            self.__relative_times.append(duration / (a + b * footprint))
+        else:
+            self.__collect_baseline(work, x, footprint, duration)
+
+        if len(self.__step_times) < MONITOR_SAMPLE_EVERY:
+            return 'none'
+
+        rss_mb = self.__process.memory_info().rss / 1024**2
+        step_avg = sum(self.__step_times) / len(self.__step_times)
+        relative_avg = sum(self.__relative_times) / len(self.__relative_times) if self.__relative_times else None
+        self.__step_times.clear()
+        self.__relative_times.clear()
+
+        self.__samples.append((rss_mb - self.__start_rss_mb, relative_avg))
+        if len(self.__samples) > MONITOR_WINDOW:
+            self.__samples.pop(0)
+
+        action = 'none'
+        reason = self.__detect()
+        if reason:
+            self.reason = reason
+            self.__samples.clear() # a full window of new samples before the next detection
+            action = MONITOR_MITIGATION
+            if action == 'pause':
+                self.__pauses += 1
+                action = 'pause' if self.__pauses <= MONITOR_MAX_PAUSES else 'stop'
+            print(f"resource monitor: {reason} -> {action}")
+        elif len(self.__samples) >= MONITOR_WINDOW:
+            self.__pauses = 0 # a healthy window, only escalate back-to-back detections
+
+        self.__write_sample(rss_mb, step_avg, relative_avg, action)
+        if action == 'pause':
+            self.__pause()
+        return action
+
+    def __collect_baseline(self, work: str, x: int, footprint: int, duration: float):
+        steps = self.__baseline_steps.setdefault(work, [])
+        # fit once an X row is complete and there are different footprints (a single Y needs a 2nd row)
+        if steps and steps[-1][0] != x and len({step[1] for step in steps}) > 1:
+            self.__trends[work] = self.__fit_trend(steps)
+            del self.__baseline_steps[work]
+            a, b = self.__trends[work]
+            self.__relative_times.append(duration / (a + b * footprint))
+            return
+        steps.append((x, footprint, duration))
+
+    def __fit_trend(self, steps: List[Tuple[int, int, float]]) -> Tuple[float, float]:
+        """
+        Least squares of step time = a + b * footprint, never decreasing with the footprint
+        """
+        mean_f = sum(step[1] for step in steps) / len(steps)
+        mean_t = sum(step[2] for step in steps) / len(steps)
+        variance = sum((step[1] - mean_f)**2 for step in steps)
+        b = max(0.0, sum((step[1] - mean_f) * (step[2] - mean_t) for step in steps) / variance)
+        # keep the intercept positive so small bins do not end up with a ~0 expected time
+        a = max(mean_t - b * mean_f, mean_t * 0.1)
+        return a, b
+
+    def __detect(self) -> str:
+        if len(self.__samples) < MONITOR_WINDOW:
+            return ''
+
+        grown = [sample[0] for sample in self.__samples if sample[0] > MONITOR_MAX_RSS_GROWTH_MB]
+        if len(grown) >= len(self.__samples) * 0.75:
+            return f"memory grew by {self.__samples[-1][0]:.0f} MB since the start"
+
+        # samples before the trend is known count as healthy
+        slow = [sample[1] for sample in self.__samples if sample[1] is not None and sample[1] > MONITOR_MAX_SLOWDOWN]
+        if len(slow) >= len(self.__samples) * 0.75:
+            return f"steps took {sum(slow) / len(slow):.2f}x as long as expected from the first row(s)"
+        return ''
+
+    def __write_sample(self, rss_mb: float, step_avg: float, relative_avg: float | None, action: str):
+        heap_mb = 0.0
+        top = ''
+        if tracemalloc.is_tracing():
+            heap_mb = tracemalloc.get_traced_memory()[0] / 1024**2
+            snapshot = tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+            top = ' | '.join(f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno} {stat.size / 1024:.0f} KB"
+                for stat in snapshot.statistics('lineno')[:MONITOR_TOP_ALLOCATORS])
+
+        with open(self.__csv_file, 'a', newline='') as f:
+            csv.writer(f).writerow([datetime.now().isoformat(timespec='seconds'), self.__steps, f"{rss_mb:.1f}", f"{rss_mb - self.__start_rss_mb:.1f}",
+                f"{heap_mb:.1f}", f"{step_avg:.3f}", '' if relative_avg is None else f"{relative_avg:.2f}", action, top])
+
+    def __pause(self):
+        # give Fusion some idle time to release viewport / compute caches
+        gc.collect()
+        end = timer() + MONITOR_PAUSE_SECONDS
+        while timer() < end:
+            adsk.doEvents()
+            time.sleep(0.1)
+
 class GridfinityBinExporter:
     __exporting = False
     __progress_dialog: adsk.core.ProgressDialog | None = None
@@ -109,6 +288,7 @@ class GridfinityBinExporter:
     __export_folder = ''
 
     __screenshot_filenames: List[str] = []
+    __screenshot_all_filenames: List[str] = []
     __screenshot_z_filenames: List[List[str]] = []
 
     __generate_gif_all = False
@@ -129,6 +309,8 @@ class GridfinityBinExporter:
     __amount = 0
     __skipped = 0
 
+    __monitor: ResourceMonitor | None = None
+
     __design: adsk.fusion.Design
     __export_manager: adsk.fusion.ExportManager
     __bin_parameter_list: List[adsk.fusion.Parameter]
@@ -152,6 +334,14 @@ class GridfinityBinExporter:
     def get_screenshot_folder(self):
         return f"{self.__export_folder}/screenshots"
 
+    def get_thumbnail_folder(self, target: str):
+        width, height, _, quality = THUMBNAIL_TARGETS[target]
+        return f"{self.__export_folder}/thumbnails/{target}-{width}x{height}q{quality}"
+
+    def get_thumbnail_filename(self, target: str, screenshot_filename: str):
+        ext = THUMBNAIL_TARGETS[target][2]
+        return f"{self.get_thumbnail_folder(target)}/{os.path.splitext(screenshot_filename)[0]}.{ext}"
+
     def calc_z(self, z_index: int):
         return self.__z_start + self.__z_increment * z_index
 
@@ -212,6 +402,50 @@ class GridfinityBinExporter:
             math.ceil((G_INPUTS.grid_z.valueTwo + 1 - G_INPUTS.grid_z.valueOne) / G_INPUTS.grid_z_step.valueOne) *
             len(G_INPUTS.wall_thickness) * amount_divisions)
         
+    def generate_thumbnails(self):
+        self.__progress_dialog.reset()
+        jobs = [(target, name) for target in THUMBNAIL_TARGETS for name in self.__screenshot_all_filenames]
+        tpl_msg = 'Resized {current} / {todo} thumbnails. Processed: %v / %m (%p%)'
+        self.__progress_dialog.show("Generating thumbnails...", tpl_msg.format(current=0, todo=len(jobs)), 0, len(jobs), 1)
+        adsk.doEvents()
+
+        for target in THUMBNAIL_TARGETS:
+            os.makedirs(self.get_thumbnail_folder(target), exist_ok=True)
+
+        current = 0
+        skipped = []
+        # Pillow releases the GIL while resampling, so threads are enough and keep Fusion's process untouched
+        executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        try:
+            futures = []
+            for target, name in jobs:
+                width, height, _, quality = THUMBNAIL_TARGETS[target]
+                futures.append(executor.submit(create_thumbnail, f"{self.get_screenshot_folder()}/{name}",
+                    self.get_thumbnail_filename(target, name), width, height, quality))
+
+            for future in as_completed(futures):
+                match future.result():
+                    case 'created':
+                        current += 1
+                        self.__progress_dialog.message = tpl_msg.format(current=current, todo=len(jobs))
+                    case 'too-small':
+                        skipped.append(futures.index(future))
+                self.__progress_dialog.progressValue += 1
+                adsk.doEvents()
+                if self.was_cancelled():
+                    raise KeyboardInterrupt
+        except KeyboardInterrupt:
+            return False
+        except:
+            G_UI.messageBox('Thumbnail creation error:\n{}'.format(traceback.format_exc()))
+            return False
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for i in sorted(skipped):
+            print(f"skipped thumbnail {jobs[i][0]} for {jobs[i][1]}: screenshot is smaller than the target")
+        print(f"resized {current} thumbnails ({len(skipped)} skipped, {len(jobs) - current - len(skipped)} cached)")
+        return True
+
     def generate_gif(self):        
         self.__progress_dialog.reset()
         to_generate = len(self.__screenshot_filenames) if self.__generate_gif_all else 0
@@ -228,12 +462,13 @@ class GridfinityBinExporter:
         gif_lossy = G_INPUTS.gif_lossy.value
         gif_optimize = G_INPUTS.gif_optimize.value
         gif_colors = G_INPUTS.gif_colors.value
+        gif_max_bytes = G_INPUTS.gif_max_kb.value * 1024
 
         gif_folder=f"{self.__export_folder}/gif"
         os.makedirs(gif_folder, exist_ok=True)
         if self.__generate_gif_all:
             if self.create_export_gif(self.__screenshot_filenames, f"{gif_folder}/complete-{datetime.now().strftime("%Y-%m-%dT%H-%M-%S")}.gif",
-                max_frames_per_gif, gif_fps, gif_optimize, gif_lossy, gif_colors):
+                max_frames_per_gif, gif_fps, gif_optimize, gif_lossy, gif_colors, gif_max_bytes):
                 current += 1
                 self.__progress_dialog.message = tpl_msg.format(current=current, todo=todo)
             adsk.doEvents()
@@ -244,7 +479,7 @@ class GridfinityBinExporter:
                     break
 
                 if self.create_export_gif(zlist, f"{gif_folder}/z{self.calc_z(zi):02}-{datetime.now().strftime("%Y-%m-%dT%H-%M-%S")}.gif",
-                    max_frames_per_gif, gif_fps, gif_optimize, gif_lossy, gif_colors):
+                    max_frames_per_gif, gif_fps, gif_optimize, gif_lossy, gif_colors, gif_max_bytes):
                     current += 1
                     self.__progress_dialog.message = tpl_msg.format(current=current, todo=todo)
                 adsk.doEvents()
@@ -316,6 +551,7 @@ class GridfinityBinExporter:
         self.__amount = 0
         self.__skipped = 0
         self.__screenshot_filenames.clear()
+        self.__screenshot_all_filenames.clear()
         self.__screenshot_z_filenames.clear()
 
         # parameter list
@@ -330,26 +566,37 @@ class GridfinityBinExporter:
         time_start = timer()
    
         try:
+            if MONITOR_SAMPLE_EVERY > 0:
+                self.__monitor = ResourceMonitor(f"{self.__export_folder}/monitor-{datetime.now().strftime("%Y-%m-%dT%H-%M-%S")}.csv")
+                self.__monitor.start()
+
             self.__export_manager = adsk.fusion.ExportManager.cast(self.__design.exportManager)
             self.__do_export_loop()
         except KeyboardInterrupt:
             self.stop_exporting()
             G_UI.messageBox(f"Aborted and created {self.__amount} stl files")
             return
+        except ResourceCheckpoint as e:
+            self.stop_exporting()
+            G_UI.messageBox(f"Stopped after {self.__amount} stl files: {e}\nRun the export again with 'Skip Existing STL' to resume.")
+            return
         except:
             self.stop_exporting()
             G_UI.messageBox('Export Error:\n{}'.format(traceback.format_exc()))
             return
         finally:
             self.__progress_dialog.progressValue = self.__progress_dialog.maximumValue
+            if self.__monitor:
+                self.__monitor.stop()
 
 
         time_end = timer()
         time_delta = timedelta(seconds=time_end - time_start)
 
-        res_msgbox = G_UI.messageBox(f"Finished and created {self.__amount} stl files. Export took {time_delta}. Continue with GIF / ZIP (if checked) after ok...")
+        res_msgbox = G_UI.messageBox(f"Finished and created {self.__amount} stl files. Export took {time_delta}. Continue with thumbnails / GIF / ZIP (if checked) after ok...")
         if res_msgbox == adsk.core.DialogResults.DialogOK or res_msgbox == adsk.core.DialogResults.DialogYes:
-            if self.__generate_gif_all or self.__generate_gif_row:
+            thumbnails_ready = not self.__skip_image_creation and self.generate_thumbnails()
+            if thumbnails_ready and (self.__generate_gif_all or self.__generate_gif_row):
                 self.generate_gif()
             self.generate_zip() 
 
@@ -370,7 +617,12 @@ class GridfinityBinExporter:
                             if not self.is_exporting() or self.was_cancelled():
                                 raise KeyboardInterrupt
 
-                            self.__do_export_loop_step(x, y, z, zi, wall_width, wi, divisions)
+                            step_start = timer()
+                            work = self.__do_export_loop_step(x, y, z, zi, wall_width, wi, divisions)
+                            # skipped variants are not relevant for the monitor (and would hide a slowdown)
+                            if work and self.__monitor:
+                                if self.__monitor.record_step(work, x, x * y, timer() - step_start) == 'stop':
+                                    raise ResourceCheckpoint(self.__monitor.reason)
 
     def __do_export_loop_step_params(self, x: int, y: int, z: int, wall_width: float, divisions: int):
         self.__design.modifyParameters(self.__bin_parameter_list, [
@@ -386,20 +638,28 @@ class GridfinityBinExporter:
         adsk.doEvents()
         adsk.doEvents()
 
-    def __do_export_loop_step(self, x: int, y: int, z: int, z_index: int, wall_width: float, wall_index: int, divisions: int):
+    def __do_export_loop_step(self, x: int, y: int, z: int, z_index: int, wall_width: float, wall_index: int, divisions: int) -> str:
+        """
+        Returns the work done in Fusion ('stl', 'image', 'stl+image') or '' if the variant was skipped
+        """
         variant_folder = TPL_VARIANT_FOLDER.format(folder=self.__export_folder, wall_width=wall_width, divisions=divisions)
         variant_name = TPL_VARIANT_NAME.format(x=f"{x:02}", y=f"{y:02}", z=f"{z:02}", wall_width=wall_width, divisions=f"{divisions:02}")
         stl_filename = f"{variant_folder}/{variant_name}.stl"
 
         if self.__generate_no_useless and self.is_useless_bin(x, divisions):
             self.__skipped += 1
-            return
+            return ''
 
-        filename_screenshot = f"{variant_name}.jpg"
-        fullpath_screenshot = f"{self.get_screenshot_folder()}/{filename_screenshot}"
-        
         should_skip_stl = self.__skip_existing_stl and os.path.isfile(stl_filename)
         should_generate_screenshot = not self.__skip_image_creation and wall_index == 0 # only for first wall width
+
+        filename_screenshot = f"{variant_name}.png"
+        # older exports captured jpg screenshots, reuse them as source if nothing is captured anyway
+        if (should_skip_stl and should_generate_screenshot and not os.path.isfile(f"{self.get_screenshot_folder()}/{filename_screenshot}")
+            and os.path.isfile(f"{self.get_screenshot_folder()}/{variant_name}.jpg")):
+            filename_screenshot = f"{variant_name}.jpg"
+        fullpath_screenshot = f"{self.get_screenshot_folder()}/{filename_screenshot}"
+        
         screenshot_exists_already = should_generate_screenshot and should_skip_stl and os.path.isfile(fullpath_screenshot)
 
         require_parameter_change = not should_skip_stl or (not screenshot_exists_already and should_generate_screenshot)
@@ -424,6 +684,7 @@ class GridfinityBinExporter:
             self.__skipped += 1
 
         if should_generate_screenshot and (screenshot_exists_already or G_APP.activeViewport.saveAsImageFile(fullpath_screenshot, INIT_SCREENSHOT_W, INIT_SCREENSHOT_H)):   
+            self.__screenshot_all_filenames.append(filename_screenshot)
             if self.__generate_gif_all:
                 self.__screenshot_filenames.append(filename_screenshot)
             if self.__generate_gif_row:
@@ -432,35 +693,124 @@ class GridfinityBinExporter:
         self.__progress_dialog.progressValue = self.get_total_processed_stl()
         adsk.doEvents()
         print(f"processed: {stl_filename}")
+        return '+'.join(work for work, done in (('stl', not should_skip_stl), ('image', should_generate_screenshot and not screenshot_exists_already)) if done)
 
     def __cm_into_mm(self, val: float):
         return round(val * 10, 2)
 
-    def __read_gif_images(self, files: List[str]):
+    def __read_gif_images(self, files: List[str], count_progress: bool = True):
         images = []
         for i, name in enumerate(files):
-            images.append(imageio.v3.imread(f"{self.get_screenshot_folder()}/{name}"))
-            self.__progress_dialog.progressValue += 1
+            images.append(imageio.v3.imread(self.get_thumbnail_filename(THUMBNAIL_GIF_TARGET, name)))
+            if count_progress:
+                self.__progress_dialog.progressValue += 1
             if i % 3 == 0:
                 adsk.doEvents()
                 if self.was_cancelled():
                     raise KeyboardInterrupt
         return images
 
+    def __gif_part_filename(self, out_file_base: str, part: int):
+        return out_file_base if part == 0 else f"{out_file_base.removesuffix('.gif')}-part{part+1}.gif"
+
     # https://www.lcdf.org/gifsicle/man.html
-    def create_export_gif(self, filenames: List[str], out_file_base: str, max_frames: int, fps: int = 6, optimize: int = 3, lossy: int = 80, colors: int = 256) -> bool:
-        splitted = list(itertools.batched(filenames, max_frames)) if max_frames > 0 else [filenames]
+    def __encode_gif(self, source: str, destination: str, optimize: int, lossy: int, colors: int) -> int:
+        pygifsicle.gifsicle(source, destination, optimize=False, colors=colors, options=['--loop', f'--lossy={lossy}', f'--optimize={optimize}'])
+        return os.path.getsize(destination)
+
+    def __encode_gif_within_budget(self, raw_file: str, out_file: str, optimize: int, levels: List[Tuple[int, int]], max_bytes: int, min_level: int = 0) -> int:
+        """
+        Binary search for the least lossy level (from min_level) which fits into max_bytes (or the most lossy one), returns the size of out_file
+        """
+        def level_file(level: int):
+            # gifsicle (pygifsicle) only accepts destinations ending with .gif
+            return f"{out_file.removesuffix('.gif')}.{level}.tmp.gif"
+
+        sizes = {}
+        low, high = min_level, len(levels) - 1
+        best = high
+        try:
+            while low <= high:
+                mid = (low + high) // 2
+                sizes[mid] = self.__encode_gif(raw_file, level_file(mid), optimize, *levels[mid])
+                if sizes[mid] <= max_bytes:
+                    best = mid
+                    high = mid - 1
+                else:
+                    low = mid + 1
+
+            os.replace(level_file(best), out_file)
+        finally:
+            for level in range(len(levels)):
+                if os.path.isfile(level_file(level)):
+                    os.remove(level_file(level))
+        print(f"gif level {best} (lossy={levels[best][0]}, colors={levels[best][1]}) after {len(sizes)} encodes: {sizes[best]} bytes")
+        return sizes[best]
+
+    def __create_export_gif_budget(self, filenames: List[str], out_file_base: str, max_frames: int, fps: int, optimize: int, lossy: int, colors: int, max_bytes: int):
+        levels = gif_quality_levels(lossy, colors)
+        raw_file = f"{out_file_base.removesuffix('.gif')}.raw.tmp.gif"
+
+        try:
+            # estimate the size per frame with the most lossy level on a few evenly spaced frames
+            sample = filenames[::max(1, len(filenames) // GIF_BUDGET_SAMPLE_FRAMES)][:GIF_BUDGET_SAMPLE_FRAMES]
+            imageio.v3.imwrite(raw_file, self.__read_gif_images(sample, False), fps=fps)
+            bytes_per_frame = self.__encode_gif(raw_file, raw_file, optimize, *levels[-1]) / len(sample)
+
+            start = 0
+            part = 0
+            while start < len(filenames):
+                if self.was_cancelled():
+                    raise KeyboardInterrupt
+
+                frames = max(1, math.floor(max_bytes * GIF_BUDGET_HEADROOM / bytes_per_frame))
+                if max_frames > 0:
+                    frames = min(frames, max_frames)
+                # spread the remaining frames evenly instead of ending with a tiny last part
+                remaining = len(filenames) - start
+                frames = math.ceil(remaining / math.ceil(remaining / frames))
+
+                images = self.__read_gif_images(filenames[start:start + frames])
+                out_file = self.__gif_part_filename(out_file_base, part)
+                min_level = 0
+                while True:
+                    imageio.v3.imwrite(raw_file, images, fps=fps) # duration seems to be broken, using fps
+                    size = self.__encode_gif_within_budget(raw_file, out_file, optimize, levels, max_bytes, min_level)
+                    if size <= max_bytes or len(images) == 1:
+                        break
+
+                    # all other levels are already known to be too big, retry only with the most lossy one
+                    min_level = len(levels) - 1
+
+                    # too big even with the most lossy level, drop frames (they are read again for the next part)
+                    bytes_per_frame = size / len(images)
+                    keep = max(1, min(len(images) - 1, math.floor(len(images) * max_bytes / size * GIF_BUDGET_HEADROOM)))
+                    self.__progress_dialog.progressValue -= len(images) - keep
+                    images = images[:keep]
+
+                start += len(images)
+                part += 1
+                print(f"generated gif: {out_file} ({len(images)} frames, {size} / {max_bytes} bytes)")
+        finally:
+            if os.path.isfile(raw_file):
+                os.remove(raw_file)
 
+    def create_export_gif(self, filenames: List[str], out_file_base: str, max_frames: int, fps: int = 6, optimize: int = 3, lossy: int = 80, colors: int = 256, max_bytes: int = 0) -> bool:
         try:
+            if max_bytes > 0:
+                self.__create_export_gif_budget(filenames, out_file_base, max_frames, fps, optimize, lossy, colors, max_bytes)
+                return True
+
+            splitted = list(itertools.batched(filenames, max_frames)) if max_frames > 0 else [filenames]
             for fi, files in enumerate(splitted):
                 if self.was_cancelled():
                     raise KeyboardInterrupt
 
                 images = self.__read_gif_images(files)                
-                out_file = out_file_base if fi == 0 else f"{out_file_base.removesuffix('.gif')}-part{fi+1}.gif"
+                out_file = self.__gif_part_filename(out_file_base, fi)
 
                 imageio.v3.imwrite(out_file, images, fps=fps) # duration seems to be broken, using fps
-                pygifsicle.gifsicle(out_file, optimize=False, colors=colors, options=['--loop', f'--lossy={lossy}', f'--optimize={optimize}'])
+                self.__encode_gif(out_file, out_file, optimize, lossy, colors)
                 print(f"generated gif: {out_file}")
 
         except KeyboardInterrupt:
@@ -512,6 +862,38 @@ class GridfinityBinExporter:
 
 G_EXPORTER: GridfinityBinExporter | None = None
 
+def gif_quality_levels(lossy: int, colors: int, steps: int = GIF_BUDGET_LEVELS) -> List[Tuple[int, int]]:
+    """
+    (lossy, colors) from lossless up to the given (most lossy) settings
+    """
+    return [(round(lossy * i / (steps - 1)), round(256 - (256 - colors) * i / (steps - 1))) for i in range(steps)]
+
+def create_thumbnail(source: str, destination: str, width: int, height: int, quality: int) -> Literal['created', 'cached', 'too-small']:
+    """
+    Resize a screenshot into a thumbnail (keeps aspect ratio), never upscales
+    """
+    if os.path.isfile(destination) and os.path.getmtime(destination) >= os.path.getmtime(source):
+        return 'cached'
+
+    with Image.open(source) as img:
+        # Image.thumbnail only shrinks, the target folder would end up with mixed sizes
+        if img.width < width and img.height < height:
+            return 'too-small'
+
+        img = img.convert('RGB')
+        # reducing_gap does a cheap integer downscale first, then Lanczos on the (much) smaller image
+        img.thumbnail((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        # write to a temp file first, so an aborted run never leaves a "cached" broken thumbnail
+        ext = os.path.splitext(destination)[1]
+        tmp_destination = f"{destination.removesuffix(ext)}.tmp{ext}"
+        if quality > 0:
+            img.save(tmp_destination, quality=quality)
+        else:
+            img.save(tmp_destination)
+    os.replace(tmp_destination, destination)
+    return 'created'
+
 def update_sliders(slider_inputs: adsk.core.CommandInputs, control_input_id: str, type: Literal['wall', 'division']):
     """
     Add / remove sliders from group
@@ -694,6 +1076,9 @@ class GridfinityBinExporterCommandCreatedHandler(adsk.core.CommandCreatedEventHa
             G_INPUTS.gif_lossy = group_gif.children.addIntegerSpinnerCommandInput('spin-gif-fps', 'Lossy', 0, 200, 1, 100)
             G_INPUTS.gif_optimize = group_gif.children.addIntegerSpinnerCommandInput('spin-gif-fps', 'Optimize', 0, 3, 1, 3)
             G_INPUTS.gif_colors = group_gif.children.addIntegerSpinnerCommandInput('spin-gif-colors', 'Colors', 32, 256, 32, 128)
+            G_INPUTS.gif_max_kb = group_gif.children.addIntegerSpinnerCommandInput('spin-gif-max-kb', 'Max KB per GIF', 0, 1000*1000, 100, 0)
+            G_INPUTS.gif_max_kb.tooltip = 'Split GIFs by file size instead of only by frames, 0 to disable'
+            G_INPUTS.gif_max_kb.tooltipDescription = 'Each part is tuned to fit just below this size, Lossy and Colors are then the most lossy settings allowed.'
            
             # ----
 
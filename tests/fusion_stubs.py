@@ -0,0 +1,42 @@
+"""
+Imports GridfinityBinExporter.py outside of Fusion 360 with stubbed Fusion / optional modules
+"""
+import importlib.util
+import os
+import sys
+import types
+from unittest import mock
+
+class StubModule(types.ModuleType):
+    """
+    Every unknown attribute is an empty class, enough for annotations and base classes
+    """
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        stub = type(name, (), {})
+        setattr(self, name, stub)
+        return stub
+
+def load_exporter():
+    adsk = StubModule('adsk')
+    adsk.core = StubModule('adsk.core')
+    adsk.fusion = StubModule('adsk.fusion')
+    adsk.doEvents = lambda: None
+
+    pil = StubModule('PIL')
+    imageio = StubModule('imageio')
+    imageio.v3 = StubModule('imageio.v3')
+
+    stubs = {
+        'adsk': adsk, 'adsk.core': adsk.core, 'adsk.fusion': adsk.fusion,
+        'imageio': imageio, 'imageio.v3': imageio.v3,
+        'pygifsicle': StubModule('pygifsicle'), 'psutil': StubModule('psutil'),
+        'PIL': pil, 'PIL.Image': pil.Image,
+    }
+    path = os.path.join(os.path.dirname(__file__), '..', 'GridfinityBinExporter.py')
+    with mock.patch.dict(sys.modules, stubs), mock.patch.dict(os.environ):
+        spec = importlib.util.spec_from_file_location('GridfinityBinExporter', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
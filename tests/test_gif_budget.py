@@ -0,0 +1,112 @@
+import json
+import os
+import types
+
+import pytest
+
+from fusion_stubs import load_exporter
+
+FRAMES = 40
+
+def frame_weight(name: str) -> int:
+    # every third frame is cheap, so the evenly spaced size estimate is too optimistic
+    return 200 if int(name.removeprefix('f')) % 3 == 0 else 1000
+
+def encoded_size(frames, lossy: int, colors: int) -> int:
+    return int(sum(frame_weight(frame) for frame in frames) * (1 - lossy / 250) * (0.5 + colors / 512))
+
+class FakeGifsicle:
+    """
+    Behaves like pygifsicle.gifsicle: size depends on the frames and the lossy / colors setting
+    """
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, sources, destination=None, optimize=False, colors=256, options=None):
+        if not destination.endswith('.gif'):
+            raise ValueError('Given destination path is not a gif image.')
+        lossy = int(next(option for option in options if option.startswith('--lossy=')).split('=')[1])
+        with open(sources) as f:
+            frames = json.load(f)
+
+        size = encoded_size(frames, lossy, colors)
+        self.calls.append((destination, lossy, colors, size))
+        with open(destination, 'w') as f:
+            json.dump(frames, f)
+            f.write(' ' * max(0, size - f.tell()))
+
+def write_frames(path, images, fps):
+    with open(path, 'w') as f:
+        json.dump(list(images), f)
+
+@pytest.fixture
+def exporter(monkeypatch):
+    module = load_exporter()
+    gifsicle = FakeGifsicle()
+    monkeypatch.setattr(module, 'pygifsicle', types.SimpleNamespace(gifsicle=gifsicle))
+    monkeypatch.setattr(module, 'imageio', types.SimpleNamespace(v3=types.SimpleNamespace(
+        imread=lambda path: os.path.splitext(os.path.basename(path))[0], imwrite=write_frames)))
+
+    instance = module.GridfinityBinExporter()
+    instance._GridfinityBinExporter__progress_dialog = types.SimpleNamespace(progressValue=0, wasCancelled=False)
+    return module, instance, gifsicle
+
+def test_budget_parts_fit_and_cover_all_frames(exporter, tmp_path):
+    module, instance, gifsicle = exporter
+    filenames = [f"f{i}.png" for i in range(FRAMES)]
+    budget = 8000
+
+    instance._GridfinityBinExporter__create_export_gif_budget(filenames, str(tmp_path / 'complete.gif'), 0, 6, 3, 100, 128, budget)
+
+    parts = sorted(tmp_path.glob('*.gif'))
+    assert 'complete.gif' in [part.name for part in parts]
+    frames = []
+    for part in parts:
+        assert os.path.getsize(part) <= budget
+        with open(part) as f:
+            frames += json.JSONDecoder().raw_decode(f.read())[0]
+    assert sorted(frames, key=lambda name: int(name[1:])) == [f"f{i}" for i in range(FRAMES)]
+    assert not list(tmp_path.glob('*.tmp*')) # levels and raw file are cleaned up
+
+def test_retry_only_encodes_the_most_lossy_level(exporter, tmp_path):
+    module, instance, gifsicle = exporter
+    most_lossy = module.gif_quality_levels(100, 128)[-1]
+    filenames = [f"f{i}.png" for i in range(FRAMES)]
+    budget = 8000
+
+    instance._GridfinityBinExporter__create_export_gif_budget(filenames, str(tmp_path / 'complete.gif'), 0, 6, 3, 100, 128, budget)
+
+    # the estimate is too optimistic, so the first part is too big even with the most lossy level
+    level_calls = [call for call in gifsicle.calls if '.raw.' not in call[0]]
+    too_big = [i for i, call in enumerate(level_calls) if call[1:3] == most_lossy and call[3] > budget]
+    assert too_big
+    for i in too_big:
+        assert level_calls[i + 1][1:3] == most_lossy
+
+def test_binary_search_picks_least_lossy_level(exporter, tmp_path):
+    module, instance, gifsicle = exporter
+    levels = module.gif_quality_levels(200, 32)
+    raw_file = str(tmp_path / 'raw.tmp.gif')
+    write_frames(raw_file, ['f1', 'f2'], 6) # 2000 bytes lossless
+
+    size = instance._GridfinityBinExporter__encode_gif_within_budget(raw_file, str(tmp_path / 'out.gif'), 3, levels, 1200)
+
+    least_lossy = next(level for level in levels if encoded_size(['f1', 'f2'], *level) <= 1200)
+    assert size == encoded_size(['f1', 'f2'], *least_lossy)
+    assert len(gifsicle.calls) <= 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['out.gif', 'raw.tmp.gif']
+
+def test_failing_encode_leaves_no_temp_files(exporter, tmp_path):
+    module, instance, gifsicle = exporter
+    raw_file = str(tmp_path / 'raw.tmp.gif')
+    write_frames(raw_file, ['f1', 'f2'], 6)
+
+    def broken(sources, destination=None, **kwargs):
+        with open(destination, 'w') as f:
+            f.write('partial')
+        raise RuntimeError('gifsicle crashed')
+    module.pygifsicle.gifsicle = broken
+
+    with pytest.raises(RuntimeError):
+        instance._GridfinityBinExporter__encode_gif_within_budget(raw_file, str(tmp_path / 'out.gif'), 3, module.gif_quality_levels(100, 128), 1200)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['raw.tmp.gif']
@@ -0,0 +1,67 @@
+import os
+import struct
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tools'))
+import golden_compare
+
+def box(sx: float, sy: float, sz: float) -> np.ndarray:
+    v = np.array([[x, y, z] for x in (0, sx) for y in (0, sy) for z in (0, sz)], dtype=np.float64)
+    faces = [(0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5), (0, 4, 5), (0, 5, 1),
+             (2, 3, 7), (2, 7, 6), (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3)]
+    return v[np.array(faces)]
+
+def subdivide(triangles: np.ndarray) -> np.ndarray:
+    a, b, c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    ab, bc, ca = (a + b) / 2, (b + c) / 2, (c + a) / 2
+    return np.concatenate([np.stack(t, axis=1) for t in ((a, ab, ca), (ab, b, bc), (ca, bc, c), (ab, bc, ca))])
+
+def write_stl(path: str, triangles: np.ndarray):
+    with open(path, 'wb') as f:
+        f.write(b'\0' * 80 + struct.pack('<I', len(triangles)))
+        for triangle in triangles:
+            f.write(struct.pack('<12fH', 0, 0, 0, *triangle.reshape(-1), 0))
+
+def compare(tmp_path, new: np.ndarray, golden: np.ndarray):
+    write_stl(tmp_path / 'new.stl', new)
+    write_stl(tmp_path / 'golden.stl', golden)
+    return golden_compare.compare_variant(str(tmp_path / 'new.stl'), str(tmp_path / 'golden.stl'),
+        golden_compare.INIT_SAMPLES, golden_compare.INIT_TOLERANCE)
+
+def test_point_triangle_distance_regions():
+    a, b, c = np.array([[0., 0, 0]]), np.array([[1., 0, 0]]), np.array([[0., 1, 0]])
+    points = np.array([[0.2, 0.2, 1], [-1, -1, 0], [2, 0, 0], [0.5, -1, 0], [1, 1, 0]])
+    expected = [1, np.sqrt(2), 1, 1, np.sqrt(0.5)]
+    n = len(points)
+    result = golden_compare.point_triangle_distance(points, a.repeat(n, 0), b.repeat(n, 0), c.repeat(n, 0))
+    assert result == pytest.approx(expected)
+
+def test_shuffled_mesh_is_identical(tmp_path):
+    mesh = box(42, 42, 21)
+    assert compare(tmp_path, mesh[::-1], mesh)[0] == golden_compare.STATUS_SAME
+
+def test_retessellated_mesh_is_within_tolerance(tmp_path):
+    mesh = box(42, 42, 21)
+    status, hausdorff, mean = compare(tmp_path, subdivide(subdivide(subdivide(mesh))), mesh)
+    assert status == golden_compare.STATUS_OK
+    assert hausdorff < 1e-4
+
+def test_changed_mesh_measures_the_deviation(tmp_path):
+    mesh = box(42, 42, 21)
+    status, hausdorff, _ = compare(tmp_path, box(42, 42, 21.5), mesh)
+    assert status == golden_compare.STATUS_CHANGED
+    assert hausdorff == pytest.approx(0.5, abs=1e-4)
+
+def test_broken_variant_is_reported_as_error(tmp_path):
+    for root, empty in (('new', True), ('golden', False)):
+        folder = tmp_path / root / 'wall-1.5' / 'divisions-01'
+        folder.mkdir(parents=True)
+        write_stl(folder / 'gfbin1.2_01x01x03_w1.5d01.stl', np.zeros((0, 3, 3)) if empty else box(42, 42, 21))
+        write_stl(folder / 'gfbin1.2_02x01x03_w1.5d01.stl', box(84, 42, 21))
+
+    report = golden_compare.compare_exports(str(tmp_path / 'new'), str(tmp_path / 'golden'), workers=1)
+    assert [row[1] for row in report] == [golden_compare.STATUS_ERROR, golden_compare.STATUS_SAME]
@@ -0,0 +1,86 @@
+import tracemalloc
+import types
+
+import pytest
+
+from fusion_stubs import load_exporter
+
+ROWS = 10
+Y = range(1, 11)
+VARIANTS_PER_Y = 30 # z / wall / divisions
+
+class FakeProcess:
+    rss_mb = 500.0
+
+    def memory_info(self):
+        return types.SimpleNamespace(rss=self.rss_mb * 1024**2)
+
+@pytest.fixture
+def module(monkeypatch):
+    module = load_exporter()
+    monkeypatch.setattr(module, 'psutil', types.SimpleNamespace(Process=FakeProcess))
+    monkeypatch.setattr(module, 'MONITOR_MITIGATION', 'stop')
+    monkeypatch.setattr(FakeProcess, 'rss_mb', 500.0)
+    return module
+
+def run(module, csv_file, slowdown_per_row: float = 1.0, leak_mb: float = 0.0, size_dependent: bool = True) -> list:
+    """
+    Export loop x -> y -> rest with growing bins, returns (variant, action) of all mitigations
+    """
+    monitor = module.ResourceMonitor(str(csv_file))
+    monitor.start()
+    actions = []
+    n = 0
+    try:
+        for x in range(1, ROWS + 1):
+            for y in Y:
+                for i in range(VARIANTS_PER_Y):
+                    work = 'stl+image' if i % 3 == 0 else 'stl'
+                    duration = (2.0 + 0.05 * x * y * (1 + i % 6) if size_dependent else 3.0) * slowdown_per_row**(x - 1)
+                    FakeProcess.rss_mb += leak_mb
+                    n += 1
+                    action = monitor.record_step(work, x, x * y, duration)
+                    if action != 'none':
+                        actions.append((n, action))
+    finally:
+        monitor.stop()
+    return actions
+
+def test_normal_run_is_not_flagged(module, tmp_path):
+    assert run(module, tmp_path / 'monitor.csv') == []
+
+def test_steady_slowdown_is_detected(module, tmp_path):
+    # 15% per row, ~3.5x at the end
+    actions = run(module, tmp_path / 'monitor.csv', slowdown_per_row=1.15)
+    assert actions and actions[0][1] == 'stop'
+
+def test_steady_slowdown_without_size_dependency_is_detected(module, tmp_path):
+    assert run(module, tmp_path / 'monitor.csv', slowdown_per_row=1.15, size_dependent=False)
+
+def test_memory_leak_is_detected(module, tmp_path):
+    # 3 MB per variant, never 1 GB within a single window
+    actions = run(module, tmp_path / 'monitor.csv', leak_mb=3)
+    assert actions and actions[0][0] < 1024 / 3 + module.MONITOR_WINDOW * module.MONITOR_SAMPLE_EVERY
+
+def test_pauses_escalate_only_back_to_back(module, tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'MONITOR_MITIGATION', 'pause')
+    monkeypatch.setattr(module, 'MONITOR_PAUSE_SECONDS', 0)
+    actions = [action for _, action in run(module, tmp_path / 'monitor.csv', leak_mb=3)]
+    assert actions[:module.MONITOR_MAX_PAUSES + 1] == ['pause'] * module.MONITOR_MAX_PAUSES + ['stop']
+
+def test_csv_has_a_row_per_sample(module, tmp_path):
+    run(module, tmp_path / 'monitor.csv')
+    with open(tmp_path / 'monitor.csv') as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 1 + ROWS * len(Y) * VARIANTS_PER_Y // module.MONITOR_SAMPLE_EVERY
+
+def test_keeps_foreign_tracemalloc_running(module, tmp_path, monkeypatch):
+    monkeypatch.setattr(module, 'MONITOR_TRACEMALLOC', True)
+    tracemalloc.start()
+    try:
+        monitor = module.ResourceMonitor(str(tmp_path / 'monitor.csv'))
+        monitor.start()
+        monitor.stop()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
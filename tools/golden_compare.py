@@ -0,0 +1,320 @@
+"""
+Geometry regression check of an export against a golden export.
+
+Runs outside of Fusion 360 with a regular Python + numpy:
+
+    python tools/golden_compare.py <new-export-folder> <golden-export-folder> [--tolerance 0.05]
+
+Both folders are the `bin_*` export folders created by the exporter, STLs are matched by their
+relative path (`TPL_VARIANT_FOLDER` / `TPL_VARIANT_NAME`), so triangle order does not matter.
+"""
+import argparse
+import csv
+import glob
+import math
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# --- Templates (keep in sync with GridfinityBinExporter.py)
+
+TPL_VARIANT_FOLDER = "{folder}/wall-{wall_width}/divisions-{divisions}"
+TPL_VARIANT_NAME = "gfbin1.2_{x}x{y}x{z}_w{wall_width}d{divisions}"
+
+# --- Defaults
+
+INIT_SAMPLES = 20000 # surface points per mesh (on top of the vertices)
+INIT_TOLERANCE = 0.05 # mm, hausdorff distance above this counts as changed
+INIT_SEED = 1305693
+
+STATUS_SAME = 'identical'
+STATUS_OK = 'within-tolerance'
+STATUS_CHANGED = 'changed'
+STATUS_MISSING = 'missing'
+STATUS_NEW = 'new'
+STATUS_ERROR = 'error'
+
+def find_variants(folder: str) -> Dict[str, str]:
+    """
+    Relative path -> absolute path of all exported STLs in the export folder
+    """
+    variant_folder = TPL_VARIANT_FOLDER.format(folder=glob.escape(folder), wall_width='*', divisions='*')
+    variant_name = TPL_VARIANT_NAME.format(x='*', y='*', z='*', wall_width='*', divisions='*')
+    files = glob.glob(f"{variant_folder}/{variant_name}.stl")
+    return {os.path.relpath(path, folder).replace(os.sep, '/'): path for path in files}
+
+def read_stl(path: str) -> np.ndarray:
+    """
+    Triangles of a binary or ascii STL as (n, 3, 3) float array
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if len(data) >= 84:
+        count = struct.unpack_from('<I', data, 80)[0]
+        if len(data) == 84 + count * 50:
+            record = np.dtype([('normal', '<f4', 3), ('vertices', '<f4', (3, 3)), ('attr', '<u2')])
+            return np.frombuffer(data, dtype=record, count=count, offset=84)['vertices'].astype(np.float64)
+
+    # ascii fallback
+    vertices = [line.split()[1:4] for line in data.decode('ascii', errors='ignore').splitlines() if line.strip().startswith('vertex')]
+    return np.asarray(vertices, dtype=np.float64).reshape(-1, 3, 3)
+
+def is_same_mesh(a: np.ndarray, b: np.ndarray) -> bool:
+    """
+    Exact comparison which ignores triangle and vertex order
+    """
+    if a.shape != b.shape:
+        return False
+
+    def canonical(triangles: np.ndarray):
+        # sort vertices inside each triangle, then sort the triangles
+        vertices = np.ascontiguousarray(triangles).view([('x', 'f8'), ('y', 'f8'), ('z', 'f8')]).reshape(len(triangles), 3)
+        rows = np.sort(vertices, axis=1)
+        rows = rows.view(np.float64).reshape(len(triangles), 9)
+        return rows[np.lexsort(rows.T[::-1])]
+
+    return np.array_equal(canonical(a), canonical(b))
+
+def sample_surface(triangles: np.ndarray, samples: int, seed: int = INIT_SEED) -> np.ndarray:
+    """
+    Vertices + area weighted random points on the mesh surface
+    """
+    v0, v1, v2 = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+    area = 0.5 * np.linalg.norm(np.cross(v1 - v0, v2 - v0), axis=1)
+    if len(triangles) == 0 or not area.sum() > 0:
+        raise ValueError('mesh has no surface')
+
+    rng = np.random.default_rng(seed)
+    picked = rng.choice(len(triangles), size=samples, p=area / area.sum())
+
+    # uniform barycentric coordinates
+    u, v = rng.random(samples), rng.random(samples)
+    flip = u + v > 1
+    u[flip], v[flip] = 1 - u[flip], 1 - v[flip]
+    points = v0[picked] + u[:, None] * (v1 - v0)[picked] + v[:, None] * (v2 - v0)[picked]
+
+    return np.concatenate([np.unique(triangles.reshape(-1, 3), axis=0), points])
+
+def point_triangle_distance(p: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """
+    Distance of each point p to the triangle (a, b, c) in the same row, all (n, 3)
+
+    Closest point by voronoi regions, see "Real-Time Collision Detection" (Ericson) 5.1.5
+    """
+    def dot(u, v):
+        return np.einsum('ij,ij->i', u, v)
+
+    ab, ac, ap, bp, cp = b - a, c - a, p - a, p - b, p - c
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # inside the face, then override by the regions in reverse order of priority
+        denom = va + vb + vc
+        closest = a + ab * (vb / denom)[:, None] + ac * (vc / denom)[:, None]
+
+        region = (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0)
+        t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        closest[region] = (b + (c - b) * t[:, None])[region]
+
+        region = (vb <= 0) & (d2 >= 0) & (d6 <= 0)
+        t = d2 / (d2 - d6)
+        closest[region] = (a + ac * t[:, None])[region]
+
+        region = (d6 >= 0) & (d5 <= d6)
+        closest[region] = c[region]
+
+        region = (vc <= 0) & (d1 >= 0) & (d3 <= 0)
+        t = d1 / (d1 - d3)
+        closest[region] = (a + ab * t[:, None])[region]
+
+        region = (d3 >= 0) & (d4 <= d3)
+        closest[region] = b[region]
+
+        region = (d1 <= 0) & (d2 <= 0)
+        closest[region] = a[region]
+
+    return np.linalg.norm(p - closest, axis=1)
+
+class TriangleHash:
+    """
+    Spatial hash of triangles (by their bounding box) in cubic cells, exact distance of points to the nearest triangle
+    """
+    _OFFSETS = np.array([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)])
+    _MAX_CELL = (1 << 21) - 4 # 21 bits per axis in _keys, minus the shift and neighbour offsets
+    _MAX_ENTRIES = 1 << 23
+    _MAX_PAIRS = 1 << 21 # point / triangle pairs per vectorized batch
+
+    def __init__(self, triangles: np.ndarray, origin: np.ndarray, cell_size: float):
+        # degenerated triangles have no surface, their edges are part of the neighbour triangles
+        area = np.linalg.norm(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1)
+        self.triangles = triangles[area > 0]
+        if len(self.triangles) == 0:
+            raise ValueError('mesh has no surface')
+        self._origin = origin
+
+        # coarser cells until a sane amount of (cell, triangle) entries, big triangles span a lot of cells
+        while True:
+            self.cell_size = cell_size
+            low = self._cells(self.triangles.min(axis=1))
+            high = self._cells(self.triangles.max(axis=1))
+            dims = high - low + 1
+            counts = dims.prod(axis=1)
+            if counts.sum() <= self._MAX_ENTRIES:
+                break
+            cell_size *= 2
+
+        if low.min() < -1 or high.max() > self._MAX_CELL:
+            raise ValueError(f"mesh does not fit into the spatial hash with cell size {self.cell_size}")
+
+        # expand each bounding box into its cells
+        triangle_idx = np.repeat(np.arange(len(self.triangles)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        dims = dims[triangle_idx]
+        cells = low[triangle_idx] + np.stack([local // (dims[:, 1] * dims[:, 2]), (local // dims[:, 2]) % dims[:, 1], local % dims[:, 2]], axis=1)
+
+        keys = self._keys(cells)
+        order = np.argsort(keys, kind='stable')
+        self._sorted_triangles = triangle_idx[order]
+        self._unique_keys, self._starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+        self._ends = self._starts + counts
+
+    def _cells(self, points: np.ndarray) -> np.ndarray:
+        return np.floor((points - self._origin) / self.cell_size).astype(np.int64)
+
+    def _keys(self, cells: np.ndarray) -> np.ndarray:
+        # shift by 2 so clipped cells + the -1 neighbour offset stay positive, 21 bits per axis
+        cells = cells + 2
+        return (cells[:, 0] << 42) | (cells[:, 1] << 21) | cells[:, 2]
+
+    def _candidates(self, cells: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (query index, triangle index) pairs of the triangles registered in the given cell of each query
+        """
+        keys = self._keys(cells)
+        pos = np.searchsorted(self._unique_keys, keys).clip(max=len(self._unique_keys) - 1)
+        found = self._unique_keys[pos] == keys
+        counts = np.where(found, self._ends[pos] - self._starts[pos], 0)
+
+        query_idx = np.repeat(np.arange(len(cells)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return query_idx, self._sorted_triangles[np.repeat(self._starts[pos], counts) + local]
+
+    def _update(self, best: np.ndarray, queries: np.ndarray, query_idx: np.ndarray, triangle_idx: np.ndarray):
+        for batch in range(0, len(query_idx), self._MAX_PAIRS):
+            q = query_idx[batch:batch + self._MAX_PAIRS]
+            t = self.triangles[triangle_idx[batch:batch + self._MAX_PAIRS]]
+            np.minimum.at(best, q, point_triangle_distance(queries[q], t[:, 0], t[:, 1], t[:, 2]))
+
+    def nearest_distance(self, queries: np.ndarray) -> np.ndarray:
+        # queries further outside are more than one cell away anyway and end up in the brute force below
+        cells = self._cells(queries).clip(-1, self._MAX_CELL)
+        best = np.full(len(queries), np.inf)
+
+        # 1. own cell: exact if closer than the cell border, any other triangle is beyond it (covers equal surfaces)
+        self._update(best, queries, *self._candidates(cells))
+        relative = (queries - self._origin) / self.cell_size - cells
+        border = np.minimum(relative, 1 - relative).min(axis=1) * self.cell_size
+        todo = np.flatnonzero(best > border)
+
+        # 2. 3x3x3 block: exact if closer than one cell
+        for chunk in np.array_split(todo, math.ceil(len(todo) / 1024) or 1):
+            for offset in self._OFFSETS:
+                query_idx, triangle_idx = self._candidates(cells[chunk] + offset)
+                self._update(best, queries, chunk[query_idx], triangle_idx)
+
+        # 3. brute force the rest against all triangles
+        far = todo[best[todo] > self.cell_size]
+        rows = max(1, self._MAX_PAIRS // len(self.triangles))
+        for chunk in np.array_split(far, math.ceil(len(far) / rows) or 1):
+            self._update(best, queries, np.repeat(chunk, len(self.triangles)), np.tile(np.arange(len(self.triangles)), len(chunk)))
+        return best
+
+def compare_variant(new_file: str, golden_file: str, samples: int, tolerance: float) -> Tuple[str, float, float]:
+    """
+    Returns status, hausdorff and mean deviation in mm
+    """
+    new_mesh = read_stl(new_file)
+    golden_mesh = read_stl(golden_file)
+    if is_same_mesh(new_mesh, golden_mesh):
+        return STATUS_SAME, 0.0, 0.0
+
+    # sampled points of one mesh against the triangles of the other, independent of the tessellation
+    new_points = sample_surface(new_mesh, samples)
+    golden_points = sample_surface(golden_mesh, samples)
+
+    # one grid for both meshes, ~128 cells along the longest axis
+    vertices = np.concatenate([new_mesh.reshape(-1, 3), golden_mesh.reshape(-1, 3)])
+    origin = vertices.min(axis=0)
+    cell_size = max(np.ptp(vertices, axis=0).max() / 128, 1e-6)
+
+    new_to_golden = TriangleHash(golden_mesh, origin, cell_size).nearest_distance(new_points)
+    golden_to_new = TriangleHash(new_mesh, origin, cell_size).nearest_distance(golden_points)
+
+    hausdorff = float(max(new_to_golden.max(), golden_to_new.max()))
+    mean = float((new_to_golden.sum() + golden_to_new.sum()) / (len(new_to_golden) + len(golden_to_new)))
+    return (STATUS_CHANGED if hausdorff > tolerance else STATUS_OK), hausdorff, mean
+
+def compare_exports(new_folder: str, golden_folder: str, samples: int = INIT_SAMPLES, tolerance: float = INIT_TOLERANCE,
+                    workers: int | None = None) -> List[Tuple[str, str, float, float]]:
+    """
+    Compare all variants in parallel, ranked by hausdorff distance (missing / new / error first)
+    """
+    new_variants = find_variants(new_folder)
+    golden_variants = find_variants(golden_folder)
+
+    report = [(name, STATUS_MISSING, math.inf, math.inf) for name in golden_variants.keys() - new_variants.keys()]
+    report += [(name, STATUS_NEW, math.inf, math.inf) for name in new_variants.keys() - golden_variants.keys()]
+
+    common = sorted(new_variants.keys() & golden_variants.keys())
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(compare_variant, new_variants[name], golden_variants[name], samples, tolerance): name for name in common}
+        for i, future in enumerate(as_completed(futures)):
+            try:
+                status, hausdorff, mean = future.result()
+            except Exception as e:
+                # a broken STL should not stop the whole report
+                print(f"error comparing {futures[future]}: {e!r}", file=sys.stderr)
+                status, hausdorff, mean = STATUS_ERROR, math.inf, math.inf
+            report.append((futures[future], status, hausdorff, mean))
+            print(f"compared {i + 1} / {len(common)}", end='\r', file=sys.stderr)
+    print(file=sys.stderr)
+
+    report.sort(key=lambda row: (-row[2], -row[3], row[0]))
+    return report
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description='Compare exported STLs against a golden export')
+    parser.add_argument('new', help='export folder to check')
+    parser.add_argument('golden', help='golden export folder')
+    parser.add_argument('--tolerance', type=float, default=INIT_TOLERANCE, help=f"max hausdorff distance in mm (default {INIT_TOLERANCE})")
+    parser.add_argument('--samples', type=int, default=INIT_SAMPLES, help=f"surface samples per mesh (default {INIT_SAMPLES})")
+    parser.add_argument('--workers', type=int, default=None, help='parallel processes (default: cpu count)')
+    parser.add_argument('--csv', default=None, help='write the full report to this csv file')
+    parser.add_argument('--top', type=int, default=50, help='amount of changed bins to print')
+    args = parser.parse_args(argv)
+
+    report = compare_exports(args.new, args.golden, args.samples, args.tolerance, args.workers)
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['variant', 'status', 'hausdorff_mm', 'mean_mm'])
+            writer.writerows(report)
+
+    failed = [row for row in report if row[1] in (STATUS_CHANGED, STATUS_MISSING, STATUS_NEW, STATUS_ERROR)]
+    for name, status, hausdorff, mean in failed[:args.top]:
+        print(f"{status:>16}  hausdorff {hausdorff:9.4f} mm  mean {mean:9.4f} mm  {name}")
+
+    print(f"{len(report)} variants, {len(failed)} changed / missing / new / error (tolerance {args.tolerance} mm)")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())